@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import os
+import sys
+import mmap
+import bisect
+import binascii
+import datetime as dt
+import queue
+import struct
+import threading
+import time
+
+from arElement import arElement
+
+# Capture file layout
+#   CAP_MAGIC file header
+#   records of CAP_REC header (time, direction, length) + AX.25 frame
+# Index file layout, capture path + CAP_IDX_EXT
+#   CAP_IDX entries (time, capture offset), one every CAP_IDX_SECS
+CAP_MAGIC    = b"ARCAP01\n"
+CAP_REC      = struct.Struct("<dBI")
+CAP_IDX      = struct.Struct("<dQ")
+CAP_IDX_EXT  = ".idx"
+CAP_IDX_SECS = 60
+
+# Frame direction
+CAP_TX = 0
+CAP_RX = 1
+
+class arCapture(arElement, threading.Thread):
+    # append only frame capture, callers only queue the frame so the
+    # transmit path never waits on disk
+    def __init__(self, path):
+        arElement.__init__(self)
+        threading.Thread.__init__(self, daemon=True)
+
+        self.path = path
+        self._q = queue.SimpleQueue()
+
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "ab")
+        # entries left from a removed or rotated capture point at old data
+        self._fi = open(path + CAP_IDX_EXT, "wb" if new else "ab")
+        if new:
+            self._f.write(CAP_MAGIC)
+            self._f.flush()
+        self._lastidx = 0
+
+    def capture(self, direction, pkt):
+        self._q.put((time.time(), direction, pkt))
+
+    def stop(self):
+        self._q.put(None)
+        self.join()
+
+    def run(self):
+        self.arPrint("Capturing frames to %s" % self.path)
+        while True:
+            rec = self._q.get()
+            if rec is None:
+                break
+            self.writeRecord(*rec)
+
+            # flush once the queue is drained
+            if self._q.empty():
+                self._f.flush()
+                self._fi.flush()
+
+        self._f.close()
+        self._fi.close()
+
+    def writeRecord(self, ts, direction, pkt):
+        if ts - self._lastidx >= CAP_IDX_SECS:
+            self._fi.write(CAP_IDX.pack(ts, self._f.tell()))
+            self._lastidx = ts
+        self._f.write(CAP_REC.pack(ts, direction, len(pkt)))
+        self._f.write(pkt)
+
+class arCaptureReader():
+    # memory mapped capture reader, frames are returned as memoryview
+    # slices of the map and must be released before close()
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(CAP_MAGIC)] != CAP_MAGIC:
+            self.close()
+            raise ValueError("Invalid capture file[%s]" % path)
+        self._mv = memoryview(self._mm)
+
+        # sparse time index, reads scan from the file start if missing
+        self._idxts = []
+        self._idxoff = []
+        try:
+            with open(path + CAP_IDX_EXT, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = b""
+        for ts, off in CAP_IDX.iter_unpack(data[:len(data) - len(data) % CAP_IDX.size]):
+            # stale index, offset beyond the mapped capture
+            if off >= len(self._mm):
+                break
+            self._idxts.append(ts)
+            self._idxoff.append(off)
+
+    def close(self):
+        if hasattr(self, "_mv"):
+            self._mv.release()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def seek(self, start):
+        # offset of last index entry at or before start
+        i = bisect.bisect_right(self._idxts, start) - 1
+        return self._idxoff[i] if i >= 0 else len(CAP_MAGIC)
+
+    def records(self, start=None, end=None):
+        # yield (time, direction, frame) within [start, end]
+        off = self.seek(start) if start is not None else len(CAP_MAGIC)
+        size = len(self._mm)
+        while off + CAP_REC.size <= size:
+            ts, direction, plen = CAP_REC.unpack_from(self._mm, off)
+            off += CAP_REC.size
+            if off + plen > size:
+                # truncated final record
+                break
+            if end is not None and ts > end:
+                break
+            if start is None or ts >= start:
+                yield ts, direction, self._mv[off:off + plen]
+            off += plen
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 4):
+        print("Usage: %s CAPTURE [START END]" % sys.argv[0])
+        sys.exit(1)
+    start = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    end = float(sys.argv[3]) if len(sys.argv) > 2 else None
+    with arCaptureReader(sys.argv[1]) as r:
+        for ts, direction, frame in r.records(start, end):
+            print("%s %s %s" % (dt.datetime.fromtimestamp(ts).isoformat(),
+                                "TX" if direction == CAP_TX else "RX",
+                                binascii.hexlify(frame).decode()))
+            frame.release()
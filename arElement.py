@@ -18,16 +18,23 @@
 # Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
 #
 import datetime as dt
-import pytz
-from tzlocal import get_localzone
 
 import threading
 
+# local timezone, tzlocal is only imported when no timezone is given
+_arLtz = None
+
+def arLocalZone():
+    global _arLtz
+    if _arLtz is None:
+        from tzlocal import get_localzone
+        _arLtz = get_localzone()
+    return _arLtz
+
 class arElement():
     def __init__(self):
         self._arName = "%s" % (self.__class__.__name__)
-        self._arLtz = get_localzone()
-        self._arTz = self._arLtz
+        self._arTz = None
         self._arPrintLock = threading.Lock()
 
     @property
@@ -40,19 +47,23 @@ class arElement():
 
     @property
     def arTz(self):
-        return self._arTz
+        return self._arTz if self._arTz is not None else arLocalZone()
 
     @arTz.setter
     def arTz(self, v):
         self._arTz = v
 
     def arGetLocalTime(self):
-        ldt = self._arLtz.localize(dt.datetime.now())
-        return ldt.astimezone(self._arTz)
+        return dt.datetime.now(self.arTz)
+
+    def arLocalize(self, t):
+        # attach timezone to a naive local time, pytz zones must use
+        # localize for the UTC offset in effect on that date
+        tz = self.arTz
+        return tz.localize(t) if hasattr(tz, "localize") else t.replace(tzinfo=tz)
 
     def arGetUTCTime(self):
-        ldt = self._arLtz.localize(dt.datetime.now())
-        return ldt.astimezone(pytz.utc)
+        return dt.datetime.now(dt.timezone.utc)
 
     def arPrint(self, message):
         self._arPrintLock.acquire()
@@ -61,6 +72,7 @@ class arElement():
 
 
 if __name__ == "__main__":
+    import pytz
     e = arElement()
     print(e.arGetLocalTime().strftime("%c"))
     print(e.arGetUTCTime().strftime("%c"))
@@ -0,0 +1,292 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import sys
+import queue
+import random
+import signal
+import socket
+import struct
+import threading
+import time
+import click
+
+from arElement import arElement
+from arTNCKiss import arTNCKiss
+
+# AX.25 address, control and pid bytes ahead of the info field
+AX25_MINLEN = 7 + 7 + 2
+
+# HDLC flags and FCS added on air
+AX25_OVERHEAD = 4
+
+def ax25Addr(call, ssid, last=False, h=0x30):
+    valb = b''
+    for c in call.ljust(6).encode('utf-8'):
+        valb += (c<<1).to_bytes(1, sys.byteorder)
+    valb += ((h|ssid)<<1|(0x1 if last else 0x0)).to_bytes(1, sys.byteorder)
+    return valb
+
+class arFakeTNCStats():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._t0 = time.monotonic()
+            self.frames = 0
+            self.bytes = 0
+            self.malformed = 0
+            self.injected = 0
+            self.disconnects = 0
+            self.latency = []
+
+    def addFrame(self, plen, latency):
+        with self._lock:
+            self.frames += 1
+            self.bytes += plen
+            self.latency.append(latency)
+
+    def addMalformed(self):
+        with self._lock:
+            self.malformed += 1
+
+    def addInjected(self):
+        with self._lock:
+            self.injected += 1
+
+    def addDisconnect(self):
+        with self._lock:
+            self.disconnects += 1
+
+    def report(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._t0
+            lat = sorted(self.latency)
+            res = "frames %d (%.2f/s) bytes %d malformed %d injected %d disconnects %d" % \
+                  (self.frames, self.frames / elapsed if elapsed > 0 else 0,
+                   self.bytes, self.malformed, self.injected, self.disconnects)
+            if lat:
+                res += " latency ms min %.1f avg %.1f p95 %.1f max %.1f" % \
+                       (lat[0] * 1000, sum(lat) / len(lat) * 1000,
+                        lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000,
+                        lat[-1] * 1000)
+            return res
+
+class arFakeTNCClient(arElement, threading.Thread):
+    # one KISS client connection, frames are decoded with arTNCKiss and
+    # held for their simulated airtime on a single shared channel
+    def __init__(self, conn, addr, tnc):
+        arElement.__init__(self)
+        threading.Thread.__init__(self, daemon=True)
+        self.arName = "%s:%d" % addr
+
+        self._conn = conn
+        self._tnc = tnc
+        self._stopped = threading.Event()
+        self._txq = queue.SimpleQueue()
+        self._rxtime = 0
+        self._kiss = arTNCKiss(self.recvPacketCB, self.recvErrorCB)
+
+    def stop(self):
+        self._stopped.set()
+        try:
+            self._conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def run(self):
+        self.arPrint("Client connected")
+        threading.Thread(target=self.airLoop, daemon=True).start()
+        if self._tnc.inject > 0:
+            threading.Thread(target=self.injectLoop, daemon=True).start()
+
+        self._conn.settimeout(1)
+        t0 = time.monotonic()
+        while not self._stopped.is_set():
+            if self._tnc.dropevery and time.monotonic() - t0 >= self._tnc.dropevery:
+                self.arPrint("Simulating disconnect")
+                self._tnc.stats.addDisconnect()
+                break
+            try:
+                buf = self._conn.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if len(buf) == 0:
+                break
+            self._rxtime = time.monotonic()
+            for b in buf:
+                self._kiss.recvChar(b.to_bytes(1, sys.byteorder))
+
+        self._stopped.set()
+        self._txq.put(None)
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+        self.arPrint("Client disconnected")
+
+    def recvPacketCB(self, pkt):
+        if len(pkt) < AX25_MINLEN:
+            self.recvErrorCB("short frame")
+            return
+        self._txq.put((self._rxtime, bytes(pkt)))
+
+    def recvErrorCB(self, err):
+        if self._tnc.verbose:
+            self.arPrint("Malformed frame, %s" % err)
+        self._tnc.stats.addMalformed()
+
+    def airtime(self, plen):
+        return self._tnc.txdelay + (plen + AX25_OVERHEAD) * 8 / self._tnc.baud
+
+    def airLoop(self):
+        while True:
+            rec = self._txq.get()
+            if rec is None:
+                break
+            rxtime, pkt = rec
+            # channel is shared with injected traffic and other clients
+            with self._tnc.channel:
+                time.sleep(self.airtime(len(pkt)))
+            latency = time.monotonic() - rxtime
+            self._tnc.stats.addFrame(len(pkt), latency)
+            if self._tnc.verbose:
+                self.arPrint("TX %d bytes, latency %.1f ms" % (len(pkt), latency * 1000))
+
+    def injectLoop(self):
+        seq = 0
+        while not self._stopped.wait(random.expovariate(self._tnc.inject)):
+            seq += 1
+            pkt = self.buildInject(seq)
+            with self._tnc.channel:
+                time.sleep(self.airtime(len(pkt)))
+            try:
+                self._conn.sendall(self._kiss.framePacket(pkt))
+            except OSError:
+                break
+            self._tnc.stats.addInjected()
+
+    def buildInject(self, seq):
+        # position beacon from a synthetic station, some digipeated
+        ssid = seq % 16
+        hdr = ax25Addr("APZFRG", 0)
+        if seq % 3:
+            hdr += ax25Addr("N0CALL", ssid)
+            hdr += ax25Addr("WIDE2", 1, last=True, h=0x70)
+        else:
+            hdr += ax25Addr("N0CALL", ssid, last=True)
+        hdr += struct.pack('B B', 0x03, 0xf0)
+        info = "!%02d%02d.%02dN/%03d%02d.%02dW-Synthetic %d" % \
+               (random.randrange(90), random.randrange(60), random.randrange(100),
+                random.randrange(180), random.randrange(60), random.randrange(100),
+                seq)
+        return hdr + info.encode('utf-8')
+
+class arFakeTNC(arElement):
+    def __init__(self, host, port, baud, txdelay, inject, dropevery, verbose):
+        arElement.__init__(self)
+
+        self.host = host
+        self.port = port
+        self.baud = baud
+        self.txdelay = txdelay
+        self.inject = inject
+        self.dropevery = dropevery
+        self.verbose = verbose
+
+        self.stats = arFakeTNCStats()
+        self.channel = threading.Lock()
+        self._clients = []
+        self._stopped = threading.Event()
+
+    def abortSignal(self, signum, frame):
+        self._stopped.set()
+
+    def start(self, report):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(4)
+        sock.settimeout(1)
+        self.arPrint("KISS server listening on %s[%d], %d baud" %
+                     (self.host, sock.getsockname()[1], self.baud))
+
+        nextrep = time.monotonic() + report
+        while not self._stopped.is_set():
+            try:
+                conn, addr = sock.accept()
+            except socket.timeout:
+                pass
+            except OSError:
+                break
+            else:
+                c = arFakeTNCClient(conn, addr, self)
+                self._clients = [o for o in self._clients if o.is_alive()]
+                self._clients.append(c)
+                c.start()
+
+            if report and time.monotonic() >= nextrep:
+                self.arPrint(self.stats.report())
+                nextrep = time.monotonic() + report
+
+        for c in self._clients:
+            c.stop()
+        sock.close()
+        self.arPrint(self.stats.report())
+
+
+@click.command()
+@click.option("--host", "-h", "host", default="127.0.0.1",
+    help="Listen address",
+    )
+@click.option("--port", "-p", "port", default=8001,
+    help="Listen port",
+    )
+@click.option("--baud", "-b", "baud", default=1200,
+    help="Simulated channel baud rate",
+    )
+@click.option("--txdelay", "txdelay", default=0.3,
+    help="Simulated transmit delay in seconds per frame",
+    )
+@click.option("--inject", "inject", default=0.0,
+    help="Synthetic inbound frames per second",
+    )
+@click.option("--drop-every", "dropevery", default=0.0,
+    help="Disconnect clients after this many seconds",
+    )
+@click.option("--report", "report", default=10.0,
+    help="Seconds between statistics reports, 0 to disable",
+    )
+@click.option("--verbose", is_flag=True, help="Verbose output")
+def main(host, port, baud, txdelay, inject, dropevery, report, verbose):
+    """Loopback KISS TNC for load and latency testing of arNetSked.
+    """
+
+    tnc = arFakeTNC(host, port, baud, txdelay, inject, dropevery, verbose)
+    signal.signal(signal.SIGINT, tnc.abortSignal)
+    tnc.start(report)
+
+
+if __name__ == "__main__":
+    main()
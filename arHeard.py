@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import re
+import time
+
+from arElement import arElement
+
+# heard entries kept before stale ones are pruned
+HEARD_PRUNE = 1024
+
+def ax25Call(b):
+    # decode 7 byte AX.25 address into (call, ssid, H bit)
+    call = bytes(c >> 1 for c in b[:6]).decode('ascii', 'replace').strip()
+    return call, (b[6] >> 1) & 0x0f, bool(b[6] & 0x80)
+
+class arHeard(arElement):
+    # tracks live frequency objects heard on the receive path so that
+    # beacons duplicating a fresh copy can be skipped
+    def __init__(self, call, window, verbose=False):
+        arElement.__init__(self)
+
+        m = re.search(r"([A-Za-z]{1,2}\d[A-Za-z]{1,3})-(\d{1,2})", call)
+        if not m:
+            raise ValueError("Invalid callsign format, must include ssid")
+        self._call = (m.group(1).upper(), int(m.group(2)))
+        self.window = window
+        self.verbose = verbose
+
+        # (objname, objfreq, latitude, longitude) -> monotonic time heard
+        self._heard = {}
+        self._prune = HEARD_PRUNE
+
+    def recvPacket(self, pkt):
+        # find end of address field, bit 0 set on last address
+        end = 0
+        while end + 7 <= len(pkt):
+            end += 7
+            if pkt[end - 1] & 0x01:
+                break
+        else:
+            return
+        if end < 14 or len(pkt) < end + 2:
+            return
+
+        src = ax25Call(pkt[7:14])
+        digipeated = any(ax25Call(pkt[o:o + 7])[2] for o in range(14, end, 7))
+
+        # only copies relayed by a digipeater or sent by another station,
+        # a local echo of our own frame says nothing about the channel
+        if (src[0], src[1]) == self._call and not digipeated:
+            return
+
+        key = self.decodeObject(bytes(pkt[end + 2:]))
+        if key is None:
+            return
+
+        now = time.monotonic()
+        self._heard[key] = now
+        if len(self._heard) > self._prune:
+            self.prune(now)
+
+        if self.verbose:
+            self.arPrint("Heard %s from %s-%d%s" % (key[0], src[0], src[1],
+                         " via digi" if digipeated else ""))
+
+    def decodeObject(self, info):
+        # ;NNNNNNNNN*DDHHMMzDDMM.MMN/DDDMM.MMWsFFF.FFFMHz...
+        if len(info) < 47 or info[0:1] != b';' or info[10:11] != b'*':
+            return None
+        try:
+            s = info[:47].decode('ascii')
+        except UnicodeDecodeError:
+            return None
+        m = re.fullmatch(r"([\d ]\d\d\.\d\d[\d ])MHz", s[37:47])
+        if not m:
+            return None
+        return (s[1:10].strip(), m.group(1).strip(), s[18:26], s[27:36])
+
+    def prune(self, now):
+        for k in [k for k, t in self._heard.items() if now - t > self.window]:
+            del self._heard[k]
+        # keep pruning amortized when many objects stay fresh
+        self._prune = max(HEARD_PRUNE, 2 * len(self._heard))
+
+    def isHeard(self, key):
+        t = self._heard.get(key)
+        return t is not None and time.monotonic() - t <= self.window
@@ -22,17 +22,23 @@ import os
 import sys
 import re
 import datetime as dt
-from pytz import timezone
-import click
 import math
 import threading
 import signal
 import socket
 import struct
 import binascii
+import time
+import getopt
+import marshal
 
 from arElement import arElement
 from arTNCKiss import arTNCKiss
+from arSkedDB import arSkedDB, SKED_MAXTAIL
+from arSkedIndex import arSkedIndex, WEEK_MINUTES
+from arStatus import arStatus
+from arCapture import arCapture, CAP_TX, CAP_RX
+from arHeard import arHeard
 
 def td2min(td):
     res = td.days * 24*60*60
@@ -66,6 +72,14 @@ class arNet(arElement, threading.Thread):
         self.opcall = call
         self.txCB = txCB
 
+        # weekly nets stay resident, windowed nets retire after kill beacons
+        self.repeat = True
+
+        # heard copy lookup, beacons skipped while a fresh copy is heard
+        self.heardCB = None
+        # object mode of the previous beacon, heard copies carry its status
+        self._beaconmode = 0
+
         # object mode for beacon text
         # 0 = out of time window
         # 1 = pre net 
@@ -107,7 +121,7 @@ class arNet(arElement, threading.Thread):
     def timeofday(self):
         return self._timeofday
 
-    @day.setter
+    @timeofday.setter
     def timeofday(self, v):
         # expeted format
         # HH:MM[AP]M
@@ -285,21 +299,80 @@ class arNet(arElement, threading.Thread):
         # initialize _dt to next future net time
         # unless net is currently active
 
-        self._dt = self.arGetLocalTime()
-        dayshift = self._day - self._dt.weekday()
+        now = self.arGetLocalTime()
+        dayshift = self._day - now.weekday()
         if dayshift < 0:
             dayshift += 7
 
+        # shift the naive local time, the UTC offset is then the one in
+        # effect on the net date rather than today
         hrs = math.floor(self._timeofday / 60)
         mins = self._timeofday % 60
-        self._dt = self._dt.replace(hour=hrs, minute=mins, second=0) + \
+        start = now.replace(tzinfo=None, hour=hrs, minute=mins, second=0, microsecond=0) + \
                     dt.timedelta(days=dayshift)
+        self._dt = self.arLocalize(start)
 
         if td2min(self._dt - self.arGetLocalTime()) + self._duration < 0:
-            self._dt += dt.timedelta(days = 7)
+            self._dt = self.arLocalize(start + dt.timedelta(days = 7))
+
+        self.arPrint("Time initialized, next NET starts at %s" % self._dt.strftime("%c"))
 
+    def setStartTime(self, ts):
+        # initialize _dt from an epoch start time
+        self._dt = dt.datetime.fromtimestamp(ts, dt.timezone.utc).astimezone(self.arTz)
         self.arPrint("Time initialized, next NET starts at %s" % self._dt.strftime("%c"))
 
+    def startTime(self):
+        return int(self._dt.timestamp())
+
+    def initWindowTime(self):
+        # initialize _dt to the net time whose beacon window is open now,
+        # unlike initTime this keeps a net in its kill beacons
+        now = self.arGetLocalTime().replace(second=0, microsecond=0)
+        dMin = (self._day * 24 * 60 + self._timeofday -
+                (now.weekday() * 24 * 60 + now.hour * 60 + now.minute)) % WEEK_MINUTES
+        if dMin > 30:
+            dMin -= WEEK_MINUTES
+        self._dt = self.arLocalize(now.replace(tzinfo=None) + dt.timedelta(minutes=dMin))
+
+    def fields(self):
+        # validated schedule fields, for the parsed schedule cache
+        return (self._day, self._timeofday, self._interval, self._duration,
+                self._latitude, self._longitude, self._objname, self._objfreq,
+                self._objtone, self._objrange, self._path, self._comment)
+
+    def setFields(self, f):
+        (self._day, self._timeofday, self._interval, self._duration,
+         self._latitude, self._longitude, self._objname, self._objfreq,
+         self._objtone, self._objrange, self._path, self._comment) = f
+        self.arName = self._objname
+
+    def beaconDue(self):
+        # one shot equivalent of calcWaitTime, sets beacon mode and
+        # returns True if a beacon falls in the current minute
+        now = self.arGetLocalTime().replace(second=0, microsecond=0)
+        dMin = td2min(self._dt - now)
+        due = False
+        if dMin > 30:
+            #outside net beacon time
+            self.objmode = 0
+        elif dMin <= 30 and dMin > 0:
+            #pre net beacon time, every 10 minutes
+            self.objmode = 1
+            due = dMin % 10 == 0
+        elif dMin <= 0 and (dMin + self._duration) >= 0:
+            #net beacon time, at start and every interval to the end
+            self.objmode = 2
+            due = dMin == 0 or (dMin + self._duration) % self._interval == 0
+        elif (dMin + self._duration) < 0 and (dMin + self._interval + self._duration + 7) >= 0:
+            #post net beacon time, every 3 minutes after the last interval
+            self.objmode = 3
+            dKill = dMin + self._interval + self._duration
+            due = dKill <= 0 and dKill % 3 == 0
+        else:
+            self.objmode = 0
+        return due
+
     def calcWaitTime(self):
         # calculate next wait time
         # start beacons 30 minutes before net time, every 10 minutes
@@ -336,7 +409,11 @@ class arNet(arElement, threading.Thread):
             #print ("CALC> mode: 4")
             #update _dt for next net beacon time
             self.objmode = 0
-            self._dt += dt.timedelta(days=7)
+            if not self.repeat:
+                self.arPrint("NET window complete, retiring element")
+                self._stopped.set()
+                return 0
+            self._dt = self.arLocalize(self._dt.replace(tzinfo=None) + dt.timedelta(days=7))
             dMin = td2min(self._dt - self.arGetLocalTime())
             retVal = (dMin - 30) * 60
 
@@ -349,18 +426,35 @@ class arNet(arElement, threading.Thread):
         self._stopped.set()
         self.join()
 
+    def heardKey(self):
+        return (self._objname.strip(), self._objfreq.strip(),
+                self._latitude, self._longitude)
+
+    def suppressed(self):
+        # kill beacons and the first beacon after a mode change are always
+        # sent, a heard copy of the pre net text must not hold off ON-AIR
+        first = self.objmode != self._beaconmode
+        self._beaconmode = self.objmode
+        if self.heardCB is None or first or self.objmode > 2:
+            return False
+        if self.heardCB(self.heardKey()):
+            self.arPrint("Fresh copy heard, skipping beacon")
+            return True
+        return False
+
     def run(self):
         self.arPrint("Starting NET element...")
 
         wt = self.calcWaitTime() # also sets beacon mode
         # send out initial beacon if in range
-        if self.objmode > 0:
+        if self.objmode > 0 and not self.suppressed():
             self.txCB(self.buildPacket())
 
         while not self._stopped.wait(wt):
             self.arPrint("Delay complete at %s" % self.arGetLocalTime())
             wt = self.calcWaitTime()
-            if not self._stopped.is_set() and self.objmode > 0:
+            if not self._stopped.is_set() and self.objmode > 0 and \
+                    not self.suppressed():
                 self.txCB(self.buildPacket())
 
 
@@ -451,17 +545,43 @@ class arNet(arElement, threading.Thread):
         #print(binascii.hexlify(bstr+objstr.encode('UTF-8')))
         return bstr+objstr.encode('UTF-8')
 
+# seconds between schedule database window queries
+SKED_REQUERY = 60
+
+def skedCachePath(skedfile):
+    cdir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    # one cache per schedule path, separators escaped as in systemd units
+    name = os.path.abspath(skedfile).strip(os.sep).replace(os.sep, "-")
+    return os.path.join(cdir, "arNetSked", name + ".cache")
+
 class arNetSked(arElement):
-    def __init__(self, call, skedfile, host, port, tz, verbose):
+    def __init__(self, call, skedfile, host, port, tz, verbose, window=60,
+                 statusport=None, capturefile=None, suppress=0):
         arElement.__init__(self)
 
         self._objlist = []
+        self._aborted = threading.Event()
+        self.tncsock = None
+        self.skeddb = None
+        self.skedindex = None
+        self.statusport = statusport
+        self.status = None
+        self.capturefile = capturefile
+        self.capture = None
+        self.heard = arHeard(call, suppress * 60, verbose) if suppress > 0 else None
+
+        # windowed nets loaded from schedule database, rowid -> (net, start)
+        self._windowed = {}
+        # invalid schedule database rows, rowid -> fields already reported
+        self._badrows = {}
+        self.window = window
 
         self.call = call
         self.skedfile = skedfile
         self.tnchost = host
         self.tncport = port
         if tz is not None:
+            from pytz import timezone
             self.arTz = timezone(tz)
 
         self.verbose = verbose
@@ -471,11 +591,22 @@ class arNetSked(arElement):
         self.abort()
 
     def abort(self):
-        if len(self._objlist):
+        self._aborted.set()
+        # parsed nets are only started by runSked, skip any not yet running
+        nets = self._objlist + [o for o, s in list(self._windowed.values())]
+        nets = [o for o in nets if o.ident is not None]
+        if len(nets):
             self.arPrint("Stopping arNetSked")
-            for o in self._objlist:
+            for o in nets:
                 o.stop()
 
+        if self.status:
+            self.status.stop()
+
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
+
         if self.tncsock:
             self.arPrint("Closing TNC socket")
             try:
@@ -485,6 +616,38 @@ class arNetSked(arElement):
 
     def start(self):
 
+        if not self.loadSked():
+            return
+
+        if self.statusport:
+            self.status = arStatus(self.statusport, self.statusCmd)
+            self.status.start()
+
+        if self.capturefile:
+            self.capture = arCapture(self.capturefile)
+            self.capture.start()
+
+        self.connectTNC()
+
+        self.tnckiss = arTNCKiss(self.recvPacketCB)
+
+
+        if self.skeddb:
+            self.runWindowed()
+        else:
+            self.runSked()
+
+        # close socket
+        try:
+            self.tncsock.close()
+        except OSError:
+            pass
+
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
+
+    def connectTNC(self):
         # connect to TNC
         self.arPrint("Binding TNC client socket...")
 
@@ -509,49 +672,286 @@ class arNetSked(arElement):
 
         self.tncsock.settimeout(1) # 1s timeout
 
-        self.tnckiss = arTNCKiss(self.recvPacketCB)
+    def buildNet(self, opts):
+        # build net element from whitespace split schedule fields
+        objn = arNet(self.call, self.tranPacketCB, self.arTz)
+        if self.heard:
+            objn.heardCB = self.heard.isHeard
+        objn.day       = opts[0]
+        objn.timeofday = opts[1]
+        iad = opts[2].split('/')
+        objn.interval  = iad[0]
+        objn.duration  = iad[1]
+        objn.latitude  = opts[3]
+        objn.longitude = opts[4]
+        objn.objname   = opts[5]
+        objn.objfreq   = opts[6]
+        objn.objtone   = opts[7]
+        objn.objrange  = opts[8]
+        objn.path      = opts[9]
+        if len(opts) > 9:
+            objn.comment = " ".join(opts[10:])
+        return objn
+
+    def loadSked(self, scan=False):
+        # parse schedule and index net windows for conflict checks, a
+        # schedule database is only read in full when scan is requested
+        if arSkedDB.isSkedDB(self.skedfile):
+            self.arPrint("Opening schedule database...")
+            self.skeddb = arSkedDB(self.skedfile)
+            if not scan:
+                return True
+            self.skedindex = arSkedIndex()
+            for rowid, opts in self.skeddb.allRows():
+                try:
+                    objn = self.buildNet(opts)
+                except ValueError as err:
+                    self.rowError(rowid, opts, err)
+                    continue
+                self.skedindex.addNet(objn, "row[%d]" % rowid)
+        else:
+            self.skedindex = arSkedIndex()
+            self.arPrint("Opening schedule file...")
+            with open(self.skedfile) as f:
+                # skip first two lines
+                d = f.readline()
+                d = f.readline()
+                lineno = 2
+                for line in f:
+                    lineno += 1
+                    if re.search('^\s*#', line):
+                        continue
+                    line = line.ljust(75)
 
+                    try:
+                        objn = self.buildNet(line.split())
+                    except ValueError as err:
+                        self.arPrint("Error processing schedule line[%d]" % lineno)
+                        self.arPrint(err)
+                        return False
+
+                    self._objlist.append(objn)
+                    self.skedindex.addNet(objn, "line[%d]" % lineno)
+
+        self.skedindex.build()
+        self.arPrint("Indexed %d nets" % len(self.skedindex))
+        conflicts = self.skedindex.conflicts()
+        for a, b, kind, key in conflicts:
+            self.arPrint("WARNING %s and %s share %s %s in overlapping windows" %
+                         (self.skedindex.net(a)[0], self.skedindex.net(b)[0], kind, key))
+        if not conflicts:
+            self.arPrint("No schedule conflicts found")
+        return True
+
+    def queryIndex(self, wmin, minutes):
+        # index of nets near minute of week wmin for status queries, a
+        # running schedule database is queried on each request by start
+        # time so rows inserted while running are seen
+        if self.skedindex is not None:
+            return self.skedindex
+
+        now = self.arGetLocalTime().replace(second=0, microsecond=0)
+        nowmin = now.weekday() * 24 * 60 + now.hour * 60 + now.minute
+        t = int(now.timestamp()) + ((wmin - nowmin) % WEEK_MINUTES) * 60
+
+        # stored start times fall within a week of now, check the
+        # occurrences either side, with an hour of slack for DST
+        index = arSkedIndex()
+        seen = set()
+        db = arSkedDB(self.skedfile)
+        try:
+            for k in (-1, 0, 1):
+                lo = t + k * WEEK_MINUTES * 60
+                for rowid, opts, nextstart in db.startRows(lo - SKED_MAXTAIL - 3600,
+                                                           lo + (minutes + 30) * 60 + 3600):
+                    if rowid in seen:
+                        continue
+                    seen.add(rowid)
+                    try:
+                        objn = self.buildNet(opts)
+                    except ValueError:
+                        continue
+                    index.addNet(objn, "row[%d]" % rowid)
+        finally:
+            db.close()
+        index.build()
+        return index
+
+    def weekMinute(self, spec=None):
+        # minute of week for "DAY HH:MM[AP]M", current time if not given
+        if not spec:
+            t = self.arGetLocalTime()
+            return t.weekday() * 24 * 60 + t.hour * 60 + t.minute
+
+        opts = spec.split()
+        if len(opts) != 2:
+            raise ValueError("Invalid time[%s], format must match DAY HH:MM[AP]M" % spec)
+        objn = arNet(self.call, None, self.arTz)
+        objn.day = opts[0].upper()
+        objn.timeofday = opts[1].upper()
+        return objn.day * 24 * 60 + objn.timeofday
+
+    def statusCmd(self, line):
+        # status socket and command line queries against the schedule index
+        opts = line.split(None, 1)
+        cmd = opts[0].upper()
+        arg = opts[1] if len(opts) > 1 else None
+
+        if cmd == "ACTIVE":
+            try:
+                wmin = self.weekMinute(arg)
+            except ValueError as err:
+                return "ERROR %s" % err
+            index = self.queryIndex(wmin, 0)
+            res = []
+            for idx in index.activeAt(wmin):
+                label, name, freq = index.net(idx)
+                res.append("%s %s %s" % (label, name, freq))
+            return "\n".join(res) if res else "No active nets"
+        elif cmd == "OVERLAP":
+            # OVERLAP DAY HH:MM[AP]M MINUTES
+            args = arg.split() if arg else []
+            if len(args) != 3 or not args[2].isdigit():
+                return "ERROR format must match OVERLAP DAY HH:MM[AP]M MINUTES"
+            try:
+                wmin = self.weekMinute(" ".join(args[:2]))
+            except ValueError as err:
+                return "ERROR %s" % err
+            minutes = min(int(args[2]), WEEK_MINUTES)
+            index = self.queryIndex(wmin, minutes)
+            res = []
+            for idx in index.overlapping(wmin, minutes):
+                label, name, freq = index.net(idx)
+                res.append("%s %s %s" % (label, name, freq))
+            return "\n".join(res) if res else "No overlapping nets"
+        elif cmd == "CONFLICTS":
+            # a schedule database is checked from now through the window
+            index = self.queryIndex(self.weekMinute(), self.window)
+            res = []
+            for a, b, kind, key in index.conflicts():
+                res.append("%s %s %s %s" % (index.net(a)[0],
+                                            index.net(b)[0], kind, key))
+            return "\n".join(res) if res else "No schedule conflicts"
+        else:
+            return "Commands: ACTIVE [DAY HH:MM[AP]M], OVERLAP DAY HH:MM[AP]M MINUTES, CONFLICTS, QUIT"
 
-        self.arPrint("Opening schedule file...")
-        with open(self.skedfile) as f:
-            # skip first two lines
-            d = f.readline()
-            d = f.readline()
-            lineno = 2
-            for line in f:
-                lineno += 1
-                if re.search('^\s*#', line):
-                    continue
-    #            print (line)
-                line = line.ljust(75)
+    def loadSkedCache(self):
+        # validated schedule fields, reparsed only when the file changes
+        st = os.stat(self.skedfile)
+        key = (os.path.abspath(self.skedfile), st.st_mtime_ns, st.st_size)
+        path = skedCachePath(self.skedfile)
+        try:
+            with open(path, "rb") as f:
+                ckey, rows = marshal.load(f)
+            if ckey == key:
+                return rows
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
 
-                objn = arNet(self.call, self.tranPacketCB, self.arTz)
-                opts = line.split()
+        if not self.loadSked():
+            return None
+        rows = [o.fields() for o in self._objlist]
+        self._objlist = []
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                marshal.dump((key, rows), f)
+            os.replace(path + ".tmp", path)
+        except OSError as err:
+            self.arPrint("Unable to write schedule cache %s" % path)
+            self.arPrint(err)
+        return rows
+
+    def loadOnceNets(self):
+        # nets with a beacon window open now, initialized to that window
+        nets = []
+        if arSkedDB.isSkedDB(self.skedfile):
+            self.skeddb = arSkedDB(self.skedfile)
+            now = time.time()
+            starts = []
+            for rowid, opts in self.skeddb.pendingRows(now):
                 try:
-                    objn.day       = opts[0]
-                    objn.timeofday = opts[1]
-                    iad = opts[2].split('/')
-                    objn.interval  = iad[0]
-                    objn.duration  = iad[1]
-                    objn.latitude  = opts[3]
-                    objn.longitude = opts[4]
-                    objn.objname   = opts[5]
-                    objn.objfreq   = opts[6]
-                    objn.objtone   = opts[7]
-                    objn.objrange  = opts[8]
-                    objn.path      = opts[9]
-                    if len(opts) > 9:
-                        objn.comment = " ".join(opts[10:])
-
+                    objn = self.buildNet(opts)
                 except ValueError as err:
-                    self.arPrint("Error processing schedule line[%d]" % lineno)
+                    self.arPrint("Error processing schedule row[%d]" % rowid)
                     self.arPrint(err)
-                    self.abort()
-                    break
-
-                self._objlist.append(objn)
+                    continue
                 objn.initTime()
-                objn.start()
+                starts.append((objn.startTime(), rowid))
+            self.skeddb.setNextStarts(starts)
+            for rowid, opts, nextstart in self.skeddb.windowRows(now):
+                try:
+                    objn = self.buildNet(opts)
+                except ValueError:
+                    continue
+                objn.setStartTime(nextstart)
+                nets.append(objn)
+            self.skeddb.close()
+            return nets
+
+        rows = self.loadSkedCache()
+        if rows is None:
+            return None
+        wmin = self.weekMinute()
+        for f in rows:
+            lo, hi = arSkedIndex.windowBounds(f[0], f[1], f[3], f[2])
+            if (wmin - lo) % WEEK_MINUTES > hi - lo:
+                continue
+            objn = arNet(self.call, self.tranPacketCB, self.arTz)
+            objn.setFields(f)
+            objn.initWindowTime()
+            nets.append(objn)
+        return nets
+
+    def once(self):
+        # stateless run, send beacons due this minute in one batch,
+        # returns the exit status for timer driven runs
+        nets = self.loadOnceNets()
+        if nets is None:
+            return 1
+        due = [o for o in nets if o.beaconDue()]
+        if not due:
+            self.arPrint("No beacons due")
+            return 0
+
+        if self.capturefile:
+            self.capture = arCapture(self.capturefile)
+            self.capture.start()
+
+        self.connectTNC()
+        self.tnckiss = arTNCKiss(self.recvPacketCB)
+
+        frames = b''
+        for o in due:
+            pkt = o.buildPacket()
+            frames += self.tnckiss.framePacket(pkt)
+            if self.capture:
+                self.capture.capture(CAP_TX, pkt)
+
+        status = 0
+        try:
+            self.tncsock.sendall(frames)
+        except OSError as err:
+            self.arPrint("Unable to send beacons to %s[%s]" % (self.tnchost, self.tncport))
+            self.arPrint(err)
+            status = 1
+        else:
+            self.arPrint("Sent %d beacons" % len(due))
+
+        try:
+            self.tncsock.close()
+        except OSError:
+            pass
+
+        if self.capture:
+            self.capture.stop()
+            self.capture = None
+        return status
+
+    def runSked(self):
+        for objn in self._objlist:
+            objn.initTime()
+            objn.start()
 
         self.arPrint("NET elements started...")
         # wait for net objects to cleanup
@@ -561,73 +961,245 @@ class arNetSked(arElement):
             for o in self._objlist:
                 o.join(1)
                 ndy += 1 if o.is_alive() else 0
-                # discard inbound packets from tnc
-                more_rx = 1
-                while more_rx:
-                    try:
-                        c = self.tncsock.recv(1)
-                    except socket.timeout:
-                        more_rx = 0
-                    except OSError:
-                        more_rx = 0
-                    else:
-                        if len(c) == 0: # can this happen?
-                            more_rx = 0
-                        else:
-                            self.tnckiss.recvChar(c)
-
-        # close socket
-        try:
-            self.tncsock.close()
-        except OSError:
-            pass
+                self.recvDrain()
+
+    def runWindowed(self):
+        # only nets due within the window are resident, each one retires
+        # after its kill beacons and is picked up again next week
+        self.arPrint("NET window of %d minutes..." % self.window)
+        nextq = 0
+        while not self._aborted.is_set():
+            if time.monotonic() >= nextq:
+                self.loadWindow()
+                nextq = time.monotonic() + SKED_REQUERY
+            self.reapWindow()
+            self.recvDrain()
+
+        self.skeddb.close()
+
+    def loadWindow(self):
+        now = time.time()
+
+        # assign start times to new or stale rows
+        starts = []
+        for rowid, opts in self.skeddb.pendingRows(now):
+            if rowid in self._windowed:
+                continue
+            try:
+                objn = self.buildNet(opts)
+            except ValueError as err:
+                self.rowError(rowid, opts, err)
+                continue
+            self._badrows.pop(rowid, None)
+            objn.initTime()
+            starts.append((objn.startTime(), rowid))
+        self.skeddb.setNextStarts(starts)
+
+        for rowid, opts, nextstart in self.skeddb.windowRows(now + self.window * 60):
+            if rowid in self._windowed or self._aborted.is_set():
+                continue
+            try:
+                objn = self.buildNet(opts)
+            except ValueError as err:
+                self.rowError(rowid, opts, err)
+                continue
+            self._badrows.pop(rowid, None)
+            objn.repeat = False
+            objn.setStartTime(nextstart)
+            self._windowed[rowid] = (objn, nextstart)
+            objn.start()
+
+    def rowError(self, rowid, opts, err):
+        # bad rows are retried every window query, report each version once
+        if self._badrows.get(rowid) == opts:
+            return
+        self._badrows[rowid] = opts
+        self.arPrint("Error processing schedule row[%d]" % rowid)
+        self.arPrint(err)
+
+    def reapWindow(self):
+        for rowid, (objn, nextstart) in list(self._windowed.items()):
+            if objn.is_alive():
+                continue
+            objn.join()
+            del self._windowed[rowid]
+            if not self._aborted.is_set():
+                self.skeddb.releaseNet(rowid, nextstart)
+
+    def recvDrain(self):
+        # discard inbound packets from tnc
+        more_rx = 1
+        while more_rx:
+            try:
+                c = self.tncsock.recv(1)
+            except socket.timeout:
+                more_rx = 0
+            except OSError:
+                more_rx = 0
+            else:
+                if len(c) == 0: # can this happen?
+                    more_rx = 0
+                else:
+                    self.tnckiss.recvChar(c)
 
     def tranPacketCB(self, pkt):
         #print(binascii.hexlify(frame))
         self.tncsock.sendall(self.tnckiss.framePacket(pkt))
+        cap = self.capture
+        if cap:
+            cap.capture(CAP_TX, pkt)
 
     def recvPacketCB(self, pkt):
-        # drop inbound packets
-        pass
-
-
-@click.command()
-@click.option("--schedule", "-s", "sfile", required=True,
-    help="Schedule file to be processed",
-    type=click.Path(exists=True, dir_okay=False, readable=True),
-    )
-@click.option("--call", "-c", "call", required=True,
-    help="Operator callsign",
-    )
-@click.option("--host", "-h", "host", required=True,
-    help="TNC network or bluetooth host",
-    )
-@click.option("--port", "-p", "port", default=8001,
-    help="TNC network port or bluetooth channel",
-    )
-@click.option("--timezone", "-t", "tz", required=False,
-    help="Timezone of schedule information",
-    )
-@click.option("--verbose", is_flag=True, help="Verbose output")
-def main(sfile, call, host, port, tz, verbose):
-    """Process schedule for APRS NetSked beacons and
-    transmit over network TNC KISS server.
-    """
-
-    netsked = arNetSked(call, sfile, host, port, tz, verbose)
-    signal.signal(signal.SIGINT, netsked.abortSignal)
-#    signal.signal(signal.SIGTERM, netsked.abort)
+        cap = self.capture
+        if cap:
+            cap.capture(CAP_RX, pkt)
+        if self.heard:
+            self.heard.recvPacket(pkt)
+
 
+def onceMain(argv):
+    # --once entry point without click, timer driven runs start faster
     try:
-        netsked.start()
-    except Exception as e:
-        exc_type, exc_obj, exc_tb = sys.exc_info()
-        fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-        print("== EXCEPTION ==")
-        print("== %s\n== %s" % (exc_type, e))
-        print("== File:%s[%s]" % (fname, exc_tb.tb_lineno))
-        netsked.abort()
+        opts, args = getopt.getopt(argv, "s:c:h:p:t:",
+            ["schedule=", "call=", "host=", "port=", "timezone=", "capture=",
+             "once", "verbose"])
+    except getopt.GetoptError as err:
+        print("Error: %s" % err)
+        return 2
+
+    sfile = call = host = tz = capturefile = None
+    port = 8001
+    verbose = False
+    for o, v in opts:
+        if o in ("-s", "--schedule"):
+            sfile = v
+        elif o in ("-c", "--call"):
+            call = v
+        elif o in ("-h", "--host"):
+            host = v
+        elif o in ("-p", "--port"):
+            port = int(v)
+        elif o in ("-t", "--timezone"):
+            tz = v
+        elif o == "--capture":
+            capturefile = v
+        elif o == "--verbose":
+            verbose = True
+
+    if args or sfile is None or call is None or host is None:
+        print("Usage: arNetSked.py --once -s SCHEDULE -c CALL -h HOST "
+              "[-p PORT] [-t TIMEZONE] [--capture FILE] [--verbose]")
+        return 2
+
+    if not os.path.isfile(sfile):
+        print("Error: Invalid value for '--schedule' / '-s': File '%s' does not exist." % sfile)
+        return 2
+
+    netsked = arNetSked(call, sfile, host, port, tz, verbose,
+                        capturefile=capturefile)
+    return netsked.once()
+
+
+def clickMain():
+    # click is only needed for the full command line
+    import click
+
+    @click.command()
+    @click.option("--schedule", "-s", "sfile", required=True,
+        help="Schedule file to be processed",
+        type=click.Path(exists=True, dir_okay=False, readable=True),
+        )
+    @click.option("--call", "-c", "call", required=True,
+        help="Operator callsign",
+        )
+    @click.option("--host", "-h", "host", required=False,
+        help="TNC network or bluetooth host",
+        )
+    @click.option("--port", "-p", "port", default=8001,
+        help="TNC network port or bluetooth channel",
+        )
+    @click.option("--timezone", "-t", "tz", required=False,
+        help="Timezone of schedule information",
+        )
+    @click.option("--window", "-w", "window", default=60,
+        help="Minutes of nets loaded ahead from a schedule database",
+        )
+    @click.option("--status-port", "statusport", type=int, required=False,
+        help="Local TCP port for schedule status queries",
+        )
+    @click.option("--capture", "capturefile", required=False,
+        type=click.Path(dir_okay=False, writable=True),
+        help="Append transmitted and received frames to capture file",
+        )
+    @click.option("--check", is_flag=True,
+        help="Check schedule for conflicts and exit",
+        )
+    @click.option("--active-at", "activeat", required=False,
+        help="List nets active at DAY HH:MM[AP]M, or now, and exit",
+        )
+    @click.option("--profile", "profile", required=False,
+        type=click.Choice(["timing", "sample", "cprofile"]),
+        help="Profile scheduler and TNC paths, results written at exit or SIGUSR1",
+        )
+    @click.option("--profile-dir", "profiledir", default=".",
+        type=click.Path(file_okay=False, writable=True),
+        help="Directory for profile results",
+        )
+    @click.option("--profile-interval", "profileinterval", default=60,
+        help="Seconds between memory snapshots while profiling, 0 to disable",
+        )
+    @click.option("--suppress", "suppress", default=0,
+        help="Skip beacons when a copy was heard within this many minutes, 0 to disable",
+        )
+    @click.option("--verbose", is_flag=True, help="Verbose output")
+    def main(sfile, call, host, port, tz, window, statusport, capturefile, check,
+             activeat, profile, profiledir, profileinterval, suppress, verbose):
+        """Process schedule for APRS NetSked beacons and
+        transmit over network TNC KISS server.
+
+        Use --once to send the beacons due this minute and exit,
+        for timer driven runs.
+        """
+
+        netsked = arNetSked(call, sfile, host, port, tz, verbose, window, statusport,
+                            capturefile, suppress)
+
+        if check or activeat:
+            if netsked.loadSked(scan=True) and activeat:
+                print(netsked.statusCmd("ACTIVE %s" % ("" if activeat == "now" else activeat)))
+            return
+
+        if host is None:
+            raise click.UsageError("Missing option '--host' / '-h'.")
+
+        if profile:
+            # only imported and hooked when requested
+            from arProfile import arProfile
+            prof = arProfile(profile, profiledir, profileinterval)
+            prof.hook(arNet, "calcWaitTime", "scheduler")
+            prof.hook(arNet, "buildPacket", "build")
+            prof.hook(arTNCKiss, "framePacket", "frame")
+            # decode work only, recvDrain itself mostly waits on the socket timeout
+            prof.hook(arTNCKiss, "recvChar", "rxdecode")
+            prof.start()
+
+        signal.signal(signal.SIGINT, netsked.abortSignal)
+#        signal.signal(signal.SIGTERM, netsked.abort)
+
+        try:
+            netsked.start()
+        except Exception as e:
+            exc_type, exc_obj, exc_tb = sys.exc_info()
+            fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
+            print("== EXCEPTION ==")
+            print("== %s\n== %s" % (exc_type, e))
+            print("== File:%s[%s]" % (fname, exc_tb.tb_lineno))
+            netsked.abort()
+
+    return main
 
 
 if __name__ == "__main__":
-    main()
+    if "--once" in sys.argv[1:]:
+        sys.exit(onceMain(sys.argv[1:]))
+    clickMain()()
@@ -0,0 +1,251 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import os
+import sys
+import atexit
+import cProfile
+import functools
+import marshal
+import pstats
+import signal
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from arElement import arElement
+
+PROFILE_MODES = ("timing", "sample", "cprofile")
+
+# seconds between stack samples in sample mode
+SAMPLE_RATE = 0.01
+
+class arProfile(arElement):
+    # profiling is only wired in when requested, hooked methods are
+    # replaced by timing wrappers so there is no cost when disabled
+    def __init__(self, mode, outdir, interval):
+        arElement.__init__(self)
+
+        if mode not in PROFILE_MODES:
+            raise ValueError("Invalid profile mode[%s], valid modes are %s" %
+                             (mode, ",".join(PROFILE_MODES)))
+
+        self.mode = mode
+        self.outdir = outdir
+        self.interval = interval
+        self.prefix = os.path.join(outdir, "arNetSked-%d" % os.getpid())
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._dumpreq = threading.Event()
+
+        # subsystem -> [calls, total seconds, max seconds]
+        self._timing = {}
+
+        # per thread cProfile instances
+        self._tls = threading.local()
+        self._profiles = []
+
+        # "thread;frame;frame" -> samples
+        self._samples = {}
+
+        # tracemalloc baseline and latest snapshot, (time, current, peak) log
+        self._snap0 = None
+        self._snap = None
+        self._memlog = []
+
+    def hook(self, cls, name, subsystem):
+        fn = getattr(cls, name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            p = self.enterProfile()
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                secs = time.perf_counter() - t0
+                self.exitProfile(p)
+                self.addTiming(subsystem, secs)
+
+        setattr(cls, name, wrapper)
+
+    def addTiming(self, subsystem, secs):
+        with self._lock:
+            t = self._timing.setdefault(subsystem, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += secs
+            t[2] = max(t[2], secs)
+
+    def enterProfile(self):
+        # only the outermost hooked call in a thread toggles its profiler
+        if self.mode != "cprofile":
+            return None
+        depth = getattr(self._tls, "depth", 0)
+        self._tls.depth = depth + 1
+        if depth:
+            return None
+
+        p = getattr(self._tls, "profile", None)
+        if p is None:
+            p = cProfile.Profile()
+            self._tls.profile = p
+            with self._lock:
+                self._profiles.append(p)
+        try:
+            p.enable()
+        except ValueError:
+            # another profiler is active in this interpreter
+            return None
+        return p
+
+    def exitProfile(self, p):
+        if self.mode != "cprofile":
+            return
+        self._tls.depth -= 1
+        if p is not None:
+            p.disable()
+
+    def start(self):
+        os.makedirs(self.outdir, exist_ok=True)
+        self.arPrint("Profiling in %s mode, results in %s-*" % (self.mode, self.prefix))
+
+        if self.mode == "sample":
+            threading.Thread(target=self.sampleLoop, daemon=True).start()
+
+        if self.interval > 0:
+            tracemalloc.start()
+            self._snap0 = tracemalloc.take_snapshot()
+            threading.Thread(target=self.memoryLoop, daemon=True).start()
+
+        threading.Thread(target=self.dumpLoop, daemon=True).start()
+        signal.signal(signal.SIGUSR1, self.dumpSignal)
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stopped.set()
+        self.dump()
+
+    def dumpLoop(self):
+        while not self._stopped.is_set():
+            if self._dumpreq.wait(1):
+                self._dumpreq.clear()
+                self.dump()
+
+    def threadNames(self):
+        # label threads by element name where possible
+        names = {}
+        for t in threading.enumerate():
+            names[t.ident] = t.arName if isinstance(t, arElement) else t.name
+        return names
+
+    def sampleLoop(self):
+        me = threading.get_ident()
+        names = self.threadNames()
+        while not self._stopped.wait(SAMPLE_RATE):
+            frames = sys._current_frames()
+            if any(tid not in names for tid in frames):
+                names = self.threadNames()
+            for tid, frame in frames.items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append("%s (%s:%d)" % (code.co_name,
+                                                 os.path.basename(code.co_filename),
+                                                 code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                key = ";".join(reversed(stack))
+                with self._lock:
+                    self._samples[key] = self._samples.get(key, 0) + 1
+            del frames
+
+    def memoryLoop(self):
+        while not self._stopped.wait(self.interval):
+            snap = tracemalloc.take_snapshot()
+            cur, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self._snap = snap
+                self._memlog.append((time.time(), cur, peak))
+
+    def dumpSignal(self, signum, frame):
+        # the interrupted thread may hold _lock, dump from dumpLoop instead
+        self._dumpreq.set()
+
+    def dump(self):
+        with self._lock:
+            timing = dict(self._timing)
+            samples = dict(self._samples)
+            profiles = list(self._profiles)
+            snap = self._snap
+            memlog = list(self._memlog)
+
+        with open(self.prefix + "-timing.txt", "w") as f:
+            f.write("%-12s %10s %12s %12s %12s\n" %
+                    ("SUBSYSTEM", "CALLS", "TOTAL_MS", "AVG_MS", "MAX_MS"))
+            for k, (n, tot, mx) in sorted(timing.items()):
+                f.write("%-12s %10d %12.3f %12.3f %12.3f\n" %
+                        (k, n, tot * 1000, tot / n * 1000, mx * 1000))
+
+        if self.mode == "sample":
+            # folded stacks, compatible with flamegraph.pl
+            with open(self.prefix + "-sample.folded", "w") as f:
+                for k, n in sorted(samples.items()):
+                    f.write("%s %d\n" % (k, n))
+
+        if self.mode == "cprofile" and profiles:
+            self.dumpProfiles(profiles)
+
+        if self._snap0 is not None:
+            with open(self.prefix + "-memory.txt", "w") as f:
+                for ts, cur, peak in memlog:
+                    f.write("%s current %d peak %d\n" %
+                            (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)), cur, peak))
+                if snap is not None:
+                    # growth since start grouped per module
+                    f.write("\nGrowth by subsystem\n")
+                    for st in snap.compare_to(self._snap0, "filename")[:25]:
+                        f.write("%s\n" % st)
+
+        self.arPrint("Profile written to %s-*" % self.prefix)
+
+    def dumpProfiles(self, profiles):
+        # snapshot without disabling, profilers may be active in other threads
+        paths = []
+        try:
+            for p in profiles:
+                p.snapshot_stats()
+                fd, path = tempfile.mkstemp(suffix=".pstats")
+                with os.fdopen(fd, "wb") as f:
+                    marshal.dump(p.stats, f)
+                paths.append(path)
+
+            st = pstats.Stats(*paths)
+            st.files = []
+            st.dump_stats(self.prefix + "-cprofile.pstats")
+            with open(self.prefix + "-cprofile.txt", "w") as f:
+                st.stream = f
+                st.sort_stats("cumulative").print_stats(50)
+        finally:
+            for path in paths:
+                os.remove(path)
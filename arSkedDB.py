@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import re
+import sys
+import sqlite3
+
+from arElement import arElement
+
+# schedule columns, same order as the text schedule format
+SKED_COLUMNS = ("day", "time", "rate", "latitude", "longitude", "name",
+                "freq", "tone", "rangeoffset", "path", "comment")
+
+# longest net window after start time, duration + interval + kill (minutes)
+SKED_MAXTAIL = (60 + 10 + 7 + 1) * 60
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+class arSkedDB(arElement):
+    def __init__(self, dbfile):
+        arElement.__init__(self)
+
+        self.dbfile = dbfile
+        self._db = sqlite3.connect(dbfile)
+        self.initSchema()
+
+    @staticmethod
+    def isSkedDB(path):
+        # sqlite files start with a fixed 16 byte header
+        try:
+            with open(path, "rb") as f:
+                return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+        except OSError:
+            return False
+
+    def initSchema(self):
+        # nextstart is the epoch time of the next net start, NULL until
+        # first computed so out of band inserts need not know it
+        cols = ",\n".join("    %s TEXT NOT NULL DEFAULT ''" % c for c in SKED_COLUMNS)
+        self._db.execute("CREATE TABLE IF NOT EXISTS netsked (\n"
+                         "    id INTEGER PRIMARY KEY,\n"
+                         "%s,\n"
+                         "    nextstart INTEGER\n"
+                         ")" % cols)
+        self._db.execute("CREATE INDEX IF NOT EXISTS netsked_nextstart "
+                         "ON netsked(nextstart)")
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def rowOpts(self, row):
+        # convert db row into the whitespace split fields of a schedule line
+        opts = [str(v) for v in row[:10]]
+        if row[10]:
+            opts += str(row[10]).split()
+        return opts
+
+    def allRows(self):
+        cur = self._db.execute("SELECT id, %s FROM netsked ORDER BY id"
+                               % ", ".join(SKED_COLUMNS))
+        for row in cur:
+            yield row[0], self.rowOpts(row[1:])
+
+    def pendingRows(self, now):
+        # rows without a start time or with a start time too old to
+        # still be beaconing, both need a fresh next start time
+        cur = self._db.execute("SELECT id, %s FROM netsked "
+                               "WHERE nextstart IS NULL OR nextstart < ?"
+                               % ", ".join(SKED_COLUMNS),
+                               (int(now) - SKED_MAXTAIL,))
+        for row in cur:
+            yield row[0], self.rowOpts(row[1:])
+
+    def windowRows(self, horizon):
+        # rows with a net window opening before the horizon, includes
+        # 30 minutes of pre net beacons ahead of the start time
+        cur = self._db.execute("SELECT id, %s, nextstart FROM netsked "
+                               "WHERE nextstart <= ? ORDER BY nextstart"
+                               % ", ".join(SKED_COLUMNS),
+                               (int(horizon) + 30 * 60,))
+        for row in cur:
+            yield row[0], self.rowOpts(row[1:-1]), row[-1]
+
+    def startRows(self, lo, hi):
+        # rows with a next start time within [lo, hi]
+        cur = self._db.execute("SELECT id, %s, nextstart FROM netsked "
+                               "WHERE nextstart BETWEEN ? AND ? ORDER BY nextstart"
+                               % ", ".join(SKED_COLUMNS),
+                               (int(lo), int(hi)))
+        for row in cur:
+            yield row[0], self.rowOpts(row[1:-1]), row[-1]
+
+    def setNextStarts(self, starts):
+        # (nextstart, rowid) pairs, written in a single transaction
+        self._db.executemany("UPDATE netsked SET nextstart = ? WHERE id = ?", starts)
+        self._db.commit()
+
+    def releaseNet(self, rowid, nextstart):
+        # net finished its kill beacons, clear the start time so the next
+        # local start is recomputed from day and time, unless the row was
+        # rescheduled while loaded
+        self._db.execute("UPDATE netsked SET nextstart = NULL "
+                         "WHERE id = ? AND nextstart = ?",
+                         (rowid, int(nextstart)))
+        self._db.commit()
+
+    def importSked(self, skedfile):
+        # load a text schedule, fields are validated when nets are loaded
+        rows = []
+        with open(skedfile) as f:
+            # skip first two lines
+            d = f.readline()
+            d = f.readline()
+            for line in f:
+                if re.search(r'^\s*#', line) or not line.strip():
+                    continue
+                opts = line.split()
+                opts += [""] * (10 - len(opts))
+                rows.append(opts[:10] + [" ".join(opts[10:])])
+
+        self._db.executemany("INSERT INTO netsked (%s) VALUES (%s)" %
+                             (", ".join(SKED_COLUMNS),
+                              ", ".join("?" * len(SKED_COLUMNS))), rows)
+        self._db.commit()
+        self.arPrint("Imported %d schedule lines into %s" % (len(rows), self.dbfile))
+        return len(rows)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: %s SCHEDULE DBFILE" % sys.argv[0])
+        sys.exit(1)
+    db = arSkedDB(sys.argv[2])
+    db.importSked(sys.argv[1])
+    db.close()
@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import bisect
+import heapq
+
+from arElement import arElement
+
+WEEK_MINUTES = 7 * 24 * 60
+
+# centered interval tree node fields
+ND_CENTER = 0
+ND_BYLO   = 1
+ND_BYHI   = 2
+ND_LEFT   = 3
+ND_RIGHT  = 4
+
+class arIntervalTree():
+    # static centered interval tree over closed (lo, hi, item) intervals
+    def __init__(self, intervals):
+        self._ivs = sorted(intervals, key=lambda iv: iv[0])
+        self._los = [iv[0] for iv in self._ivs]
+        self._root = self._build(self._ivs)
+
+    def __len__(self):
+        return len(self._ivs)
+
+    def _build(self, ivs):
+        if not ivs:
+            return None
+
+        pts = sorted([iv[0] for iv in ivs] + [iv[1] for iv in ivs])
+        center = pts[len(pts) // 2]
+
+        left = []
+        right = []
+        mid = []
+        for iv in ivs:
+            if iv[1] < center:
+                left.append(iv)
+            elif iv[0] > center:
+                right.append(iv)
+            else:
+                mid.append(iv)
+
+        return [center,
+                sorted(mid, key=lambda iv: iv[0]),
+                sorted(mid, key=lambda iv: iv[1], reverse=True),
+                self._build(left),
+                self._build(right)]
+
+    def stab(self, t):
+        # intervals containing point t, O(log n + k)
+        res = []
+        node = self._root
+        while node is not None:
+            if t < node[ND_CENTER]:
+                for iv in node[ND_BYLO]:
+                    if iv[0] > t:
+                        break
+                    res.append(iv)
+                node = node[ND_LEFT]
+            elif t > node[ND_CENTER]:
+                for iv in node[ND_BYHI]:
+                    if iv[1] < t:
+                        break
+                    res.append(iv)
+                node = node[ND_RIGHT]
+            else:
+                res.extend(node[ND_BYLO])
+                break
+        return res
+
+    def overlap(self, lo, hi):
+        # intervals overlapping [lo, hi], O(log n + k)
+        # either the interval contains lo or it starts within (lo, hi]
+        res = self.stab(lo)
+        i = bisect.bisect_right(self._los, lo)
+        j = bisect.bisect_right(self._los, hi)
+        res.extend(self._ivs[i:j])
+        return res
+
+class arSkedIndex(arElement):
+    def __init__(self):
+        arElement.__init__(self)
+
+        # (label, objname, objfreq) per net
+        self._nets = []
+        self._ivs = []
+        self._tree = arIntervalTree([])
+
+    @staticmethod
+    def windowBounds(day, timeofday, duration, interval):
+        # minutes of week covering pre net, active and kill beacons
+        # same bounds as arNet.calcWaitTime
+        start = day * 24 * 60 + timeofday
+        return (start - 30, start + duration + interval + 7)
+
+    @staticmethod
+    def netWindow(net):
+        return arSkedIndex.windowBounds(net.day, net.timeofday,
+                                        net.duration, net.interval)
+
+    def addNet(self, net, label):
+        idx = len(self._nets)
+        self._nets.append((label, net.objname.strip(), net.objfreq.strip()))
+
+        # split windows wrapping across the end of the week
+        lo, hi = self.netWindow(net)
+        if lo < 0:
+            self._ivs.append((lo + WEEK_MINUTES, WEEK_MINUTES - 1, idx))
+            lo = 0
+        if hi >= WEEK_MINUTES:
+            self._ivs.append((0, hi - WEEK_MINUTES, idx))
+            hi = WEEK_MINUTES - 1
+        self._ivs.append((lo, hi, idx))
+
+    def __len__(self):
+        return len(self._nets)
+
+    def build(self):
+        self._tree = arIntervalTree(self._ivs)
+
+    def net(self, idx):
+        return self._nets[idx]
+
+    def activeAt(self, wmin):
+        # nets with a beacon window open at minute of week wmin
+        wmin %= WEEK_MINUTES
+        return sorted(set(iv[2] for iv in self._tree.stab(wmin)))
+
+    def overlapping(self, wmin, minutes):
+        # nets with a beacon window overlapping the given minutes from
+        # minute of week wmin, wrapping past the end of the week
+        lo = wmin % WEEK_MINUTES
+        hi = lo + min(minutes, WEEK_MINUTES - 1)
+        ivs = self._tree.overlap(lo, min(hi, WEEK_MINUTES - 1))
+        if hi >= WEEK_MINUTES:
+            ivs += self._tree.overlap(0, hi - WEEK_MINUTES)
+        return sorted(set(iv[2] for iv in ivs))
+
+    def conflicts(self):
+        # pairs of nets advertising the same frequency or object name
+        # in overlapping windows, sweep per key in O(n log n + k)
+        groups = {}
+        for iv in self._ivs:
+            label, name, freq = self._nets[iv[2]]
+            groups.setdefault(("freq", freq), []).append(iv)
+            groups.setdefault(("name", name), []).append(iv)
+
+        res = set()
+        for (kind, key), ivs in groups.items():
+            if len(ivs) < 2:
+                continue
+            ivs.sort()
+            active = []
+            for lo, hi, idx in ivs:
+                while active and active[0][0] < lo:
+                    heapq.heappop(active)
+                for ahi, aidx in active:
+                    if aidx != idx:
+                        res.add((min(aidx, idx), max(aidx, idx), kind, key))
+                heapq.heappush(active, (hi, idx))
+
+        return sorted(res)
+
+
+if __name__ == "__main__":
+    # same day nets twelve hours apart must not share a window
+    from arNetSked import arNet
+    ix = arSkedIndex()
+    for tod in ("08:00AM", "08:00PM"):
+        n = arNet("N0CAL-1", None)
+        n.day = "FRI"
+        n.timeofday = tod
+        n.objfreq = "146.520"
+        ix.addNet(n, tod)
+    ix.build()
+    fri = 4 * 24 * 60
+    assert ix.activeAt(fri + 20 * 60 + 15) == [1]
+    assert ix.activeAt(fri + 8 * 60 + 15) == [0]
+    assert ix.overlapping(fri, 12 * 60 - 31) == [0]
+    assert ix.overlapping(fri + 20 * 60, 60) == [1]
+    assert ix.overlapping(fri + 8 * 60, 12 * 60) == [0, 1]
+    assert ix.conflicts() == []
+    print("OK")
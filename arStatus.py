@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+#
+# Copyright (C) 2020 Richard Ferguson, K3FRG.
+#                    k3frg@arrl.net
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 675 Mass Ave, Cambridge, MA 02139, USA.
+#
+
+import socket
+import threading
+
+from arElement import arElement
+
+class arStatus(arElement, threading.Thread):
+    # line based status server on localhost, each request line is passed
+    # to cmd_cb and the returned text is sent back to the client
+    def __init__(self, port, cmd_cb):
+        arElement.__init__(self)
+        threading.Thread.__init__(self, daemon=True)
+
+        self._cmd_cb = cmd_cb
+        self._stopped = threading.Event()
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", port))
+        self._sock.listen(4)
+        self._sock.settimeout(1)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def run(self):
+        self.arPrint("Status server listening on port %d" % self._sock.getsockname()[1])
+        while not self._stopped.is_set():
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            with conn:
+                conn.settimeout(5)
+                try:
+                    f = conn.makefile("rw", encoding="utf-8", newline="\n")
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        if line.upper() == "QUIT":
+                            break
+                        f.write(self._cmd_cb(line).rstrip("\n") + "\n.\n")
+                        f.flush()
+                except OSError:
+                    pass
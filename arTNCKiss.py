@@ -51,10 +51,11 @@ ST_PKT = 2
 ST_ESC = 3
 
 class arTNCKiss(arElement):
-    def __init__(self, packet_cb):
+    def __init__(self, packet_cb, error_cb=None):
         arElement.__init__(self)
 
         self._packet_cb = packet_cb
+        self._error_cb = error_cb
         self._rx_state = ST_IDL
         self._rx_buf = bytearray(0)
 
@@ -74,7 +75,8 @@ class arTNCKiss(arElement):
                     # verify command field or drop packet
                     if self._rx_buf[0] != 0x0:
                         #self.arPrint("invalid KISS command on packet receive")
-                        pass
+                        if self._error_cb:
+                            self._error_cb("invalid KISS command")
                     else:
                         self._packet_cb(self._rx_buf[1:])
                     self._rx_buf = bytearray(0)
@@ -91,8 +93,10 @@ class arTNCKiss(arElement):
                 self._rx_buf = self._rx_buf + struct.pack("B",0xdb)
                 self._rx_state = ST_PKT
             else:
-                pass
                 #arPrint("invalid KISS escape character!")
+                self._rx_state = ST_PKT
+                if self._error_cb:
+                    self._error_cb("invalid KISS escape")
 
     # string in, bytearray out
     def framePacket(self,buf):
@@ -100,10 +104,10 @@ class arTNCKiss(arElement):
 
         for c in buf:
             hc = c.to_bytes(1, sys.byteorder)
-            if hc == FEND:
+            if c == FEND:
                 tx_buf = tx_buf + struct.pack("B", FESC)
                 tx_buf = tx_buf + struct.pack("B", TFEND)
-            elif hc == FESC:
+            elif c == FESC:
                 tx_buf = tx_buf + struct.pack("B", FESC)
                 tx_buf = tx_buf + struct.pack("B", TFESC)
             else: